@@ -1,26 +1,36 @@
 from __future__ import annotations
 
+import heapq
 import os
 import signal
 import sys
 import time
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import typer
-from rich.console import Console
-from rich.table import Table
 
 from . import __version__
-from .proc import build_ppid_map, descendants, summarize_pids
-from .state import Board, MessageBoard, SaveStore
+from .proc import (
+    ProcTable,
+    build_ppid_map,
+    descendants,
+    descendants_via_children,
+    proc_snapshot,
+    signal_pids,
+    summarize_pids,
+)
+from .state import Board, DeskState, MessageBoard, SaveStore, iso_timestamp
 from . import tmux as tmuxlib
 
+if TYPE_CHECKING:
+    from rich.console import Console
+
 app = typer.Typer(
     add_completion=False,
     help="hotdesk: a co-working style desk/session coordinator for shared machines (tmux-based).",
 )
-console = Console()
 
 
 # -----------------------------
@@ -28,12 +38,45 @@ console = Console()
 # -----------------------------
 
 
+@lru_cache(maxsize=None)
+def get_console() -> Console:
+    """Rich is only imported once something is actually printed."""
+    from rich.console import Console
+
+    return Console()
+
+
+@lru_cache(maxsize=None)
+def get_board() -> Board:
+    """Shared per-process board (one set of paths, one mkdir)."""
+    return Board()
+
+
+@lru_cache(maxsize=None)
+def get_saves() -> SaveStore:
+    return SaveStore()
+
+
+@lru_cache(maxsize=None)
+def get_messages() -> MessageBoard:
+    return MessageBoard()
+
+
+_now_iso_cached: tuple[int, str] = (-1, "")
+
+
 def now_iso() -> str:
-    return time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    # Timestamps have 1-second resolution; reformat only when the second changes.
+    global _now_iso_cached
+    sec = int(time.time())
+    if sec != _now_iso_cached[0]:
+        _now_iso_cached = (sec, iso_timestamp(sec))
+    return _now_iso_cached[1]
 
 
+@lru_cache(maxsize=64)
 def auto_workdir(name: str) -> str:
-    """Pick a reasonable per-name workspace directory."""
+    """Pick a reasonable per-name workspace directory (created once per process)."""
     for base in [Path("/srv/work"), Path.home() / "work"]:
         try:
             p = base / name
@@ -67,67 +110,101 @@ def is_tmux_active(name: str) -> bool:
     return tmuxlib.has_session(name, name)
 
 
-def ensure_desk(name: str) -> None:
-    """Ensure a desk exists on the board (prepared state)."""
-    board = Board()
-    d = board.get(name)
-    if d:
-        return
-
-    workdir = auto_workdir(name)
-
-    board.upsert(
+def ensure_desk(name: str) -> DeskState:
+    """Ensure a desk exists on the board (prepared state) and return it."""
+    # Defaults are built lazily: auto_workdir() mkdirs, which an existing desk must not trigger.
+    return get_board().get_or_create(
         name,
-        status="prepared",
-        prepared_at=now_iso(),
-        tmux_server=name,
-        tmux_session=name,
-        workdir=workdir,
+        lambda: {
+            "status": "prepared",
+            "prepared_at": now_iso(),
+            "tmux_server": name,
+            "tmux_session": name,
+            "workdir": auto_workdir(name),
+        },
     )
 
 
-def desk_pids(name: str) -> set[int]:
-    """Get current PIDs associated with a desk (from tmux)."""
-    if is_tmux_active(name):
-        ppid_map, _infos = build_ppid_map()
-        panes = tmuxlib.list_panes(name, name)
+def desk_pids(name: str, panes: list[tmuxlib.PaneInfo] | None = None) -> set[int]:
+    """Get current PIDs associated with a desk (from tmux).
+
+    Pass ``panes`` when the caller already listed them to skip another tmux call.
+    """
+    if panes is None:
+        panes = tmuxlib.try_list_panes(name, name)
+    if panes:
         roots = [p.pane_pid for p in panes]
-        return descendants(roots, ppid_map)
+        pids = descendants_via_children(roots)
+        if pids is not None:
+            return pids
+        _table, children = build_ppid_map()
+        return descendants(roots, children)
     return set()
 
 
+def collect_board_state(servers: dict[str, str]) -> dict[str, tuple[bool, set[int], str]]:
+    """Resolve (tmux active, pids, top commands) for every desk from one /proc walk.
+
+    ``servers`` maps desk name -> its tmux_server column. The walk is skipped
+    entirely when no desk has a live tmux pane.
+    """
+    desk_panes: dict[str, list[tmuxlib.PaneInfo] | None] = {}
+    by_server: dict[str, dict[str, list[tmuxlib.PaneInfo]] | None] = {}  # one list-panes per server
+    for name, server in servers.items():
+        if not server:
+            desk_panes[name] = None
+            continue
+        if server not in by_server:
+            by_server[server] = tmuxlib.list_panes_all(server)
+        server_panes = by_server[server]
+        desk_panes[name] = server_panes.get(name) if server_panes is not None else None
+
+    table: ProcTable = ProcTable()
+    children: dict[int, list[int]] = {}
+    if any(desk_panes.values()):
+        table, children = build_ppid_map()
+
+    out: dict[str, tuple[bool, set[int], str]] = {}
+    for name, panes in desk_panes.items():
+        pids: set[int] = set()
+        if panes:
+            roots = [p.pane_pid for p in panes]
+            pids = descendants(roots, children)
+
+        top = ", ".join(summarize_pids(pids, table, max_items=6)) if pids else ""
+        out[name] = (panes is not None, pids, top)
+    return out
+
+
 def show_active_desks(exclude: str | None = None) -> None:
     """Show currently active desks (tmux or processes)."""
-    board = Board()
+    board = get_board()
     desks = board.get_all()
+    servers = {
+        name: server
+        for name, server in zip(desks.keys(), desks.column("tmux_server"))
+        if not (exclude and name == exclude)
+    }
 
-    ppid_map, infos = build_ppid_map()
+    state = collect_board_state(servers)
 
     rows: list[tuple[str, str, str, str]] = []
 
-    for name, d in sorted(desks.items(), key=lambda kv: kv[0]):
-        if exclude and name == exclude:
-            continue
-
-        active_tmux = is_tmux_active(name) if d.tmux_server else False
-
-        pids: set[int] = set()
-        if active_tmux:
-            panes = tmuxlib.list_panes(name, name)
-            roots = [p.pane_pid for p in panes]
-            pids = descendants(roots, ppid_map)
+    for name in sorted(servers):
+        active_tmux, pids, top = state[name]
 
         is_active = bool(pids) or active_tmux
         if not is_active:
             continue
 
-        top = ", ".join(summarize_pids(pids, infos, max_items=6)) if pids else ""
-        rows.append((name, d.note or "", str(len(pids)) if pids else "", top))
+        rows.append((name, desks[name].note or "", str(len(pids)) if pids else "", top))
 
     if not rows:
-        console.print("No active desks right now.")
+        get_console().print("No active desks right now.")
         return
 
+    from rich.table import Table
+
     table = Table(title="Active desks (coordinate offline)")
     table.add_column("name", style="bold")
     table.add_column("note")
@@ -137,51 +214,62 @@ def show_active_desks(exclude: str | None = None) -> None:
     for r in rows:
         table.add_row(*r)
 
-    console.print(table)
+    get_console().print(table)
+
 
+def save_snapshot(
+    name: str,
+    *,
+    note: str,
+    auto: bool,
+    ts: str | None = None,
+    panes: list[tmuxlib.PaneInfo] | None = None,
+) -> Path:
+    """Write a snapshot to disk and update the board saved_at + note.
 
-def save_snapshot(name: str, *, note: str, auto: bool) -> Path:
-    """Write a snapshot to disk and update the board saved_at + note."""
-    board = Board()
-    saves = SaveStore()
+    ``panes`` may be passed by callers that already listed the desk's tmux panes.
+    """
+    board = get_board()
+    saves = get_saves()
 
     d = board.get(name)
     if not d:
         raise typer.Exit(code=1)
 
-    ts = now_iso()
+    ts = ts or now_iso()
 
-    ppid_map, infos = build_ppid_map()
+    if panes is None:
+        panes = tmuxlib.try_list_panes(name, name)
+    active_tmux = panes is not None
+    panes = panes or []
 
-    active_tmux = is_tmux_active(name)
     pids: set[int] = set()
-
-    if active_tmux:
-        panes = tmuxlib.list_panes(name, name)
-        roots = [p.pane_pid for p in panes]
-        pids = descendants(roots, ppid_map)
-
-    top = summarize_pids(pids, infos, max_items=20) if pids else []
+    top: list[str] = []
+    proc_sample: list[dict[str, Any]] = []
+
+    roots = [p.pane_pid for p in panes]
+    if roots:
+        # Only pay for the /proc walk when the desk has live panes.
+        table, children = build_ppid_map()
+        pids = descendants(roots, children)
+        top = summarize_pids(pids, table, max_items=20)
+
+        # Keep snapshot bounded
+        for pid in heapq.nsmallest(200, pids):
+            if pid not in table:
+                continue
+            proc_sample.append({"pid": pid, "ppid": table.ppid(pid), "cmdline": table.cmdline(pid)})
 
     panes_payload: list[dict[str, Any]] = []
-    if active_tmux:
-        for p in tmuxlib.list_panes(name, name):
-            panes_payload.append(
-                {
-                    "pane": f"{p.session_name}:{p.window_index}.{p.pane_index}",
-                    "pane_pid": p.pane_pid,
-                    "command": p.current_command,
-                    "title": p.title,
-                }
-            )
-
-    # Keep snapshot bounded
-    proc_sample = []
-    for pid in sorted(pids)[:200]:
-        info = infos.get(pid)
-        if not info:
-            continue
-        proc_sample.append({"pid": pid, "ppid": info.ppid, "cmdline": info.cmdline})
+    for p in panes:
+        panes_payload.append(
+            {
+                "pane": f"{p.session_name}:{p.window_index}.{p.pane_index}",
+                "pane_pid": p.pane_pid,
+                "command": p.current_command,
+                "title": p.title,
+            }
+        )
 
     payload = {
         "tool": "hotdesk",
@@ -212,11 +300,12 @@ def save_snapshot(name: str, *, note: str, auto: bool) -> Path:
 
 
 @app.command()
+@proc_snapshot()
 def prepare(name: str) -> None:
     """Look at the board and reserve your desk name."""
     show_active_desks(exclude=name)
 
-    board = Board()
+    board = get_board()
     workdir = auto_workdir(name)
 
     board.upsert(
@@ -228,25 +317,29 @@ def prepare(name: str) -> None:
         workdir=workdir,
     )
 
-    console.print(f"\nReserved desk: [bold]{name}[/bold]")
-    console.print(f"Workdir: {workdir}")
-    console.print(f"Next: hotdesk start {name}")
+    get_console().print(f"\nReserved desk: [bold]{name}[/bold]")
+    get_console().print(f"Workdir: {workdir}")
+    get_console().print(f"Next: hotdesk start {name}")
 
 
 @app.command()
 def start(name: str) -> None:
     """Check in to your desk: enter tmux session."""
-    ensure_desk(name)
+    d = ensure_desk(name)
+    board = get_board()
 
-    board = Board()
-    d = board.get(name)
-    assert d is not None
+    workdir = d.workdir or auto_workdir(name)
 
     # New start => clear saved_at so stop() can auto-save if needed.
-    board.upsert(name, status="running", started_at=now_iso(), saved_at="")
-
-    workdir = d.workdir or auto_workdir(name)
-    board.upsert(name, workdir=workdir, tmux_server=name, tmux_session=name)
+    board.upsert(
+        name,
+        status="running",
+        started_at=now_iso(),
+        saved_at="",
+        workdir=workdir,
+        tmux_server=name,
+        tmux_session=name,
+    )
 
     tmuxlib.new_or_attach(server=name, session=name, workdir=workdir)
 
@@ -254,15 +347,15 @@ def start(name: str) -> None:
 @app.command()
 def resume(name: str) -> None:
     """Re-attach to an existing tmux desk session."""
-    board = Board()
+    board = get_board()
     d = board.get(name)
 
     if not d:
-        console.print(f"[red]Error:[/red] desk '{name}' not found. Use 'hotdesk start {name}' first.")
+        get_console().print(f"[red]Error:[/red] desk '{name}' not found. Use 'hotdesk start {name}' first.")
         raise typer.Exit(code=1)
 
     if not is_tmux_active(name):
-        console.print(f"[red]Error:[/red] no active tmux session for '{name}'. Use 'hotdesk start {name}' instead.")
+        get_console().print(f"[red]Error:[/red] no active tmux session for '{name}'. Use 'hotdesk start {name}' instead.")
         raise typer.Exit(code=1)
 
     workdir = d.workdir or auto_workdir(name)
@@ -270,6 +363,7 @@ def resume(name: str) -> None:
 
 
 @app.command()
+@proc_snapshot()
 def save(name: str) -> None:
     """Save a snapshot and (optionally) leave a short note."""
     ensure_desk(name)
@@ -277,88 +371,82 @@ def save(name: str) -> None:
     note = read_note_flagless()
     path = save_snapshot(name, note=note, auto=False)
 
-    console.print(f"Saved: {path}")
+    get_console().print(f"Saved: {path}")
 
 
 @app.command()
+@proc_snapshot()
 def stop(name: str) -> None:
     """Soft stop: mark desk as stopped but keep tmux session alive (preserves history)."""
-    ensure_desk(name)
+    ts = now_iso()
+    d = ensure_desk(name)
+    board = get_board()
 
-    board = Board()
-    d = board.get(name)
-    assert d is not None
+    panes = tmuxlib.try_list_panes(name, name)
 
     # Auto-save if user never saved since last start.
     if d.started_at and not d.is_saved_since_start():
         try:
             note = d.note or "(auto-save on stop)"
-            path = save_snapshot(name, note=note, auto=True)
-            console.print(f"Auto-saved: {path}")
+            path = save_snapshot(name, note=note, auto=True, ts=ts, panes=panes)
+            get_console().print(f"Auto-saved: {path}")
         except Exception as e:
-            console.print(f"[yellow]Warning:[/yellow] auto-save failed: {e}")
+            get_console().print(f"[yellow]Warning:[/yellow] auto-save failed: {e}")
 
-    board.upsert(name, status="stopped", stopped_at=now_iso())
+    board.upsert_status(name, "stopped", "stopped_at", ts)
 
-    active = is_tmux_active(name)
-    pids = desk_pids(name) if active else set()
+    active = panes is not None
+    pids = desk_pids(name, panes) if active else set()
 
-    console.print(f"[yellow]⏸ Stopped[/yellow] desk '{name}' (tmux session preserved).")
+    get_console().print(f"[yellow]⏸ Stopped[/yellow] desk '{name}' (tmux session preserved).")
     if pids:
-        console.print(f"[dim]  {len(pids)} process(es) still running. Use 'hotdesk freeze {name}' to pause them.[/dim]")
-    console.print(f"[dim]  To resume: hotdesk start {name}[/dim]")
-    console.print(f"[dim]  To terminate completely: hotdesk kill {name}[/dim]")
+        get_console().print(f"[dim]  {len(pids)} process(es) still running. Use 'hotdesk freeze {name}' to pause them.[/dim]")
+    get_console().print(f"[dim]  To resume: hotdesk start {name}[/dim]")
+    get_console().print(f"[dim]  To terminate completely: hotdesk kill {name}[/dim]")
 
     # If running inside the tmux session, detach the client
     if tmuxlib.is_inside_session(name, name):
-        console.print(f"\n[dim]Detaching from tmux session...[/dim]")
-        import time as _time
-        _time.sleep(0.5)  # Give user time to see the message
+        get_console().print(f"\n[dim]Detaching from tmux session...[/dim]")
+        get_console().file.flush()  # the line is already on screen when tmux detaches
         tmuxlib.detach_client(name, name)
 
 
 @app.command(name="kill")
+@proc_snapshot()
 def kill_desk(name: str, force: bool = typer.Option(False, "--force", "-f", help="Skip confirmation")) -> None:
     """Hard stop: kill all processes and terminate tmux session (destroys history)."""
-    board = Board()
+    board = get_board()
     d = board.get(name)
 
     if not d:
-        console.print(f"[red]Error:[/red] desk '{name}' not found.")
+        get_console().print(f"[red]Error:[/red] desk '{name}' not found.")
         raise typer.Exit(code=1)
 
-    active = is_tmux_active(name)
-    pids = desk_pids(name) if active else set()
+    panes = tmuxlib.try_list_panes(name, name)
+    active = panes is not None
+    pids = desk_pids(name, panes) if active else set()
 
     if not force and (active or pids):
-        console.print(f"[yellow]Warning:[/yellow] This will terminate tmux session and kill {len(pids)} process(es).")
-        console.print("[yellow]All scrollback history will be lost![/yellow]")
+        get_console().print(f"[yellow]Warning:[/yellow] This will terminate tmux session and kill {len(pids)} process(es).")
+        get_console().print("[yellow]All scrollback history will be lost![/yellow]")
         confirm = typer.confirm("Are you sure?")
         if not confirm:
-            console.print("Cancelled.")
+            get_console().print("Cancelled.")
             raise typer.Exit(code=0)
 
+    ts = now_iso()
+
     # Auto-save before killing
     if d.started_at and not d.is_saved_since_start():
         try:
             note = d.note or "(auto-save on kill)"
-            path = save_snapshot(name, note=note, auto=True)
-            console.print(f"Auto-saved: {path}")
+            path = save_snapshot(name, note=note, auto=True, ts=ts, panes=panes)
+            get_console().print(f"Auto-saved: {path}")
         except Exception as e:
-            console.print(f"[yellow]Warning:[/yellow] auto-save failed: {e}")
-
-    killed = 0
-    exclude = {os.getpid()}
+            get_console().print(f"[yellow]Warning:[/yellow] auto-save failed: {e}")
 
     # Kill processes from tmux-derived process tree first
-    for pid in pids:
-        if pid in exclude:
-            continue
-        try:
-            os.kill(pid, signal.SIGTERM)
-            killed += 1
-        except Exception:
-            pass
+    killed = signal_pids(pids, signal.SIGTERM, exclude={os.getpid()}, roots=[p.pane_pid for p in panes or ()])
 
     # Then kill tmux session
     try:
@@ -366,106 +454,84 @@ def kill_desk(name: str, force: bool = typer.Option(False, "--force", "-f", help
     except Exception:
         pass
 
-    board.upsert(name, status="killed", stopped_at=now_iso())
+    board.upsert_status(name, "killed", "stopped_at", ts)
 
-    console.print(f"[red]✗ Killed[/red] desk '{name}'. Terminated {killed} process(es) and tmux session.")
+    get_console().print(f"[red]✗ Killed[/red] desk '{name}'. Terminated {killed} process(es) and tmux session.")
 
 
 @app.command()
+@proc_snapshot()
 def freeze(name: str, detach: bool = typer.Option(True, "--detach/--no-detach", help="Detach from tmux after freezing")) -> None:
     """Freeze (pause) all processes in a desk session using SIGSTOP."""
-    board = Board()
+    board = get_board()
     d = board.get(name)
 
     if not d:
-        console.print(f"[red]Error:[/red] desk '{name}' not found.")
+        get_console().print(f"[red]Error:[/red] desk '{name}' not found.")
         raise typer.Exit(code=1)
 
-    if not is_tmux_active(name):
-        console.print(f"[red]Error:[/red] no active tmux session for '{name}'.")
+    panes = tmuxlib.try_list_panes(name, name)
+    if panes is None:
+        get_console().print(f"[red]Error:[/red] no active tmux session for '{name}'.")
         raise typer.Exit(code=1)
 
     if d.status == "frozen":
-        console.print(f"[yellow]Warning:[/yellow] desk '{name}' is already frozen.")
+        get_console().print(f"[yellow]Warning:[/yellow] desk '{name}' is already frozen.")
         raise typer.Exit(code=0)
 
-    pids = desk_pids(name)
-    exclude = {os.getpid()}
-    frozen_count = 0
+    pids = desk_pids(name, panes)
+    frozen_count = signal_pids(pids, signal.SIGSTOP, exclude={os.getpid()}, roots=[p.pane_pid for p in panes or ()])
 
-    for pid in pids:
-        if pid in exclude:
-            continue
-        try:
-            os.kill(pid, signal.SIGSTOP)
-            frozen_count += 1
-        except ProcessLookupError:
-            pass
-        except PermissionError:
-            pass
-        except Exception:
-            pass
-
-    board.upsert(name, status="frozen")
+    board.upsert_status(name, "frozen")
 
-    console.print(f"[cyan]❄ Frozen[/cyan] desk '{name}'. Paused {frozen_count} process(es).")
-    console.print(f"[dim]To resume: hotdesk unfreeze {name}[/dim]")
+    get_console().print(f"[cyan]❄ Frozen[/cyan] desk '{name}'. Paused {frozen_count} process(es).")
+    get_console().print(f"[dim]To resume: hotdesk unfreeze {name}[/dim]")
 
     # If running inside the tmux session, detach the client
     if detach and tmuxlib.is_inside_session(name, name):
-        console.print(f"\n[dim]Detaching from tmux session...[/dim]")
-        import time as _time
-        _time.sleep(0.5)
+        get_console().print(f"\n[dim]Detaching from tmux session...[/dim]")
+        get_console().file.flush()  # the line is already on screen when tmux detaches
         tmuxlib.detach_client(name, name)
 
 
 @app.command()
+@proc_snapshot()
 def unfreeze(name: str) -> None:
     """Unfreeze (resume) all processes in a desk session using SIGCONT."""
-    board = Board()
+    board = get_board()
     d = board.get(name)
 
     if not d:
-        console.print(f"[red]Error:[/red] desk '{name}' not found.")
+        get_console().print(f"[red]Error:[/red] desk '{name}' not found.")
         raise typer.Exit(code=1)
 
-    if not is_tmux_active(name):
-        console.print(f"[red]Error:[/red] no active tmux session for '{name}'.")
+    panes = tmuxlib.try_list_panes(name, name)
+    if panes is None:
+        get_console().print(f"[red]Error:[/red] no active tmux session for '{name}'.")
         raise typer.Exit(code=1)
 
-    pids = desk_pids(name)
-    exclude = {os.getpid()}
-    resumed_count = 0
-
-    for pid in pids:
-        if pid in exclude:
-            continue
-        try:
-            os.kill(pid, signal.SIGCONT)
-            resumed_count += 1
-        except ProcessLookupError:
-            pass
-        except PermissionError:
-            pass
-        except Exception:
-            pass
+    pids = desk_pids(name, panes)
+    resumed_count = signal_pids(pids, signal.SIGCONT, exclude={os.getpid()}, roots=[p.pane_pid for p in panes or ()])
 
-    board.upsert(name, status="running")
+    board.upsert_status(name, "running")
 
-    console.print(f"[green]▶ Resumed[/green] desk '{name}'. Continued {resumed_count} process(es).")
+    get_console().print(f"[green]▶ Resumed[/green] desk '{name}'. Continued {resumed_count} process(es).")
 
 
 @app.command()
+@proc_snapshot()
 def status() -> None:
     """Show the board: who is active, and what they are running."""
-    board = Board()
+    board = get_board()
     desks = board.get_all()
 
     if not desks:
-        console.print("Board is empty. Start with: hotdesk prepare <name>")
+        get_console().print("Board is empty. Start with: hotdesk prepare <name>")
         raise typer.Exit(code=0)
 
-    ppid_map, infos = build_ppid_map()
+    state = collect_board_state(dict(zip(desks.keys(), desks.column("tmux_server"))))
+
+    from rich.table import Table
 
     table = Table(title="hotdesk status")
     table.add_column("name", style="bold")
@@ -477,18 +543,9 @@ def status() -> None:
     table.add_column("top commands")
 
     for name, d in sorted(desks.items(), key=lambda kv: kv[0]):
-        active_tmux = is_tmux_active(name) if d.tmux_server else False
-
-        pids: set[int] = set()
-        if active_tmux:
-            panes = tmuxlib.list_panes(name, name)
-            roots = [p.pane_pid for p in panes]
-            pids = descendants(roots, ppid_map)
-
+        active_tmux, pids, top = state[name]
         is_active = bool(pids) or active_tmux
 
-        top = ", ".join(summarize_pids(pids, infos, max_items=6)) if pids else ""
-
         saved = "yes" if d.is_saved_since_start() else ("-" if not d.started_at else "no")
 
         # Style frozen status differently
@@ -506,7 +563,7 @@ def status() -> None:
             top,
         )
 
-    console.print(table)
+    get_console().print(table)
 
 
 # -----------------------------
@@ -530,13 +587,10 @@ def read_message_text() -> str:
 
 def format_time_short(iso_time: str) -> str:
     """Format ISO time to a shorter display format."""
-    try:
-        # Parse and reformat: 2025-12-28T10:30:00+0900 -> 12/28 10:30
-        if len(iso_time) >= 16:
-            return f"{iso_time[5:7]}/{iso_time[8:10]} {iso_time[11:16]}"
-    except Exception:
-        pass
-    return iso_time[:16] if len(iso_time) > 16 else iso_time
+    # 2025-12-28T10:30:00+0900 -> 12/28 10:30
+    if len(iso_time) < 16:
+        return iso_time
+    return f"{iso_time[5:7]}/{iso_time[8:10]} {iso_time[11:16]}"
 
 
 @app.command()
@@ -546,55 +600,57 @@ def msg(name: str, text: str = typer.Argument(None)) -> None:
         text = read_message_text()
 
     if not text.strip():
-        console.print("[red]Error:[/red] message cannot be empty.")
+        get_console().print("[red]Error:[/red] message cannot be empty.")
         raise typer.Exit(code=1)
 
-    board = MessageBoard()
+    board = get_messages()
     m = board.post(author=name, text=text.strip())
+    board.flush()  # write now so a failure reaches the user and the exit code
 
-    console.print(f"[green]Posted[/green] \\[{m.id}] {name}: {text.strip()}")
+    get_console().print(f"[green]Posted[/green] \\[{m.id}] {name}: {text.strip()}")
 
 
 @app.command()
 def reply(name: str, msg_id: str, text: str = typer.Argument(None)) -> None:
     """Reply to a message. Usage: hotdesk reply <name> <msg_id> [text]"""
-    board = MessageBoard()
+    board = get_messages()
 
     parent = board.get_by_id(msg_id)
     if not parent:
-        console.print(f"[red]Error:[/red] message '{msg_id}' not found.")
+        get_console().print(f"[red]Error:[/red] message '{msg_id}' not found.")
         raise typer.Exit(code=1)
 
     if not text:
-        console.print(f"[dim]Replying to {parent.author}: {parent.text[:50]}...[/dim]")
+        get_console().print(f"[dim]Replying to {parent.author}: {parent.text[:50]}...[/dim]")
         text = read_message_text()
 
     if not text.strip():
-        console.print("[red]Error:[/red] reply cannot be empty.")
+        get_console().print("[red]Error:[/red] reply cannot be empty.")
         raise typer.Exit(code=1)
 
     m = board.post(author=name, text=text.strip(), reply_to=msg_id)
+    board.flush()
 
-    console.print(f"[green]Replied[/green] \\[{m.id}] {name} → {parent.author}: {text.strip()}")
+    get_console().print(f"[green]Replied[/green] \\[{m.id}] {name} → {parent.author}: {text.strip()}")
 
 
 @app.command()
 def messages(limit: int = typer.Option(20, "--limit", "-n", help="Number of messages to show")) -> None:
     """Show the shared message board (latest first, auto-removes after 7 days)."""
-    board = MessageBoard()
+    board = get_messages()
     all_msgs = board.get_all(latest_first=True)
 
     if not all_msgs:
-        console.print("No messages yet. Post one with: hotdesk msg <name> <text>")
+        get_console().print("No messages yet. Post one with: hotdesk msg <name> <text>")
         raise typer.Exit(code=0)
 
-    # Build a lookup for replies
-    msg_by_id = {m.id: m for m in all_msgs}
+    # Lookup for replies, built by get_all() above
+    msg_by_id = board.index()
 
     # Get first N messages (already sorted latest-first)
     recent = all_msgs[:limit]
 
-    console.print(f"\n[bold]📋 Message Board[/bold] (showing {len(recent)} of {len(all_msgs)}, 7-day retention)\n")
+    get_console().print(f"\n[bold]📋 Message Board[/bold] (showing {len(recent)} of {len(all_msgs)}, 7-day retention)\n")
 
     for m in recent:
         time_str = format_time_short(m.created_at)
@@ -604,16 +660,16 @@ def messages(limit: int = typer.Option(20, "--limit", "-n", help="Number of mess
             parent = msg_by_id[m.reply_to]
             # Truncate parent message for display
             parent_preview = parent.text[:40] + "..." if len(parent.text) > 40 else parent.text
-            console.print(
+            get_console().print(
                 f"  [dim]{time_str}[/dim] [cyan]\\[{msg_id}][/cyan] [bold]{m.author}[/bold] "
                 f"→ [dim]{parent.author}: \"{parent_preview}\"[/dim]"
             )
-            console.print(f"    ↳ {m.text}")
+            get_console().print(f"    ↳ {m.text}")
         else:
-            console.print(
+            get_console().print(
                 f"  [dim]{time_str}[/dim] [cyan]\\[{msg_id}][/cyan] [bold]{m.author}[/bold]: {m.text}"
             )
 
-    console.print(
+    get_console().print(
         "\n[dim]Commands: hotdesk msg <name> <text> | hotdesk reply <name> <id> <text>[/dim]"
     )
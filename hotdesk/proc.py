@@ -1,82 +1,277 @@
 from __future__ import annotations
 
+import heapq
 import os
-from collections import defaultdict, deque
-from dataclasses import dataclass
-from pathlib import Path
-from typing import Dict, Iterable, List, Set, Tuple
-
-@dataclass
-class ProcInfo:
-    pid: int
-    ppid: int
-    cmdline: str
-    exe: str | None = None
-    cwd: str | None = None
+import sys
+from array import array
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
 
 def _read_cmdline(pid: int) -> str:
     try:
-        raw = Path(f"/proc/{pid}/cmdline").read_bytes()
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            raw = f.read()
         raw = raw.replace(b"\x00", b" ").strip()
         return raw.decode(errors="ignore") or "(empty)"
     except Exception:
         return "(unknown)"
 
-def _read_exe(pid: int) -> str | None:
+def _read_stat(pid: int | str) -> bytes:
+    # Raw bytes via os.read: skips the text-decoding layer of Path.read_text.
+    # 512 bytes always covers the leading fields we parse.
+    fd = os.open(f"/proc/{pid}/stat", os.O_RDONLY)
     try:
-        return os.readlink(f"/proc/{pid}/exe")
-    except Exception:
-        return None
+        return os.read(fd, 512)
+    finally:
+        os.close(fd)
+
+class ProcTable:
+    """Column store for one /proc walk: parallel pid/ppid arrays plus lazy cmdline/head columns.
+
+    Cmdlines are only read from /proc the first time a PID's cmdline or head is asked for.
+    """
+
+    __slots__ = ("pids", "ppids", "heads", "cmdlines", "pid_to_idx")
+
+    def __init__(self) -> None:
+        self.pids = array("i")
+        self.ppids = array("i")
+        self.heads: list[str | None] = []
+        self.cmdlines: list[str | None] = []
+        self.pid_to_idx: dict[int,int] = {}
+
+    def add(self, pid: int, ppid: int) -> None:
+        self.pid_to_idx[pid] = len(self.pids)
+        self.pids.append(pid)
+        self.ppids.append(ppid)
+        self.heads.append(None)
+        self.cmdlines.append(None)
+
+    def __contains__(self, pid: object) -> bool:
+        return pid in self.pid_to_idx
+
+    def __len__(self) -> int:
+        return len(self.pids)
+
+    def ppid(self, pid: int) -> int:
+        return self.ppids[self.pid_to_idx[pid]]
+
+    def cmdline(self, pid: int) -> str:
+        idx = self.pid_to_idx[pid]
+        cmdline = self.cmdlines[idx]
+        if cmdline is None:
+            cmdline = self._load(idx)
+        return cmdline
+
+    def head(self, pid: int) -> str:
+        idx = self.pid_to_idx[pid]
+        head = self.heads[idx]
+        if head is None:
+            self._load(idx)
+            head = self.heads[idx]
+        return head
 
-def _read_cwd(pid: int) -> str | None:
+    def _load(self, idx: int) -> str:
+        cmdline = _read_cmdline(self.pids[idx])
+        self.cmdlines[idx] = cmdline
+        # Basename so /usr/bin/python and python group together; interned since
+        # many PIDs share a head and it is used as a Counter key.
+        self.heads[idx] = sys.intern(os.path.basename(cmdline.partition(" ")[0]))
+        return cmdline
+
+# Holds [] (not yet walked) or [(table, children)] while a proc_snapshot() is open.
+_SNAPSHOT: ContextVar[list | None] = ContextVar("hotdesk_proc_snapshot", default=None)
+
+@contextmanager
+def proc_snapshot() -> Iterator[None]:
+    # Inside this block build_ppid_map() walks /proc at most once.
+    # Also usable as a decorator around a whole command.
+    token = _SNAPSHOT.set([])
     try:
-        return os.readlink(f"/proc/{pid}/cwd")
+        yield
+    finally:
+        _SNAPSHOT.reset(token)
+
+def build_ppid_map() -> tuple[ProcTable, dict[int,list[int]]]:
+    slot = _SNAPSHOT.get()
+    if slot is None:
+        return _walk_proc()
+    if not slot:
+        slot.append(_walk_proc())
+    return slot[0]
+
+def iter_pid_stat() -> Iterator[tuple[int,int]]:
+    # Streams (pid, ppid) straight off the /proc scandir, one stat read per PID.
+    with os.scandir("/proc") as it:
+        for entry in it:
+            name = entry.name
+            # PID dirs are all-digit; every other /proc entry starts with a non-digit.
+            if not "0" <= name[0] <= "9":
+                continue
+            try:
+                # Layout is "pid (comm) S ppid ..."; comm may contain spaces/parens,
+                # so anchor on its last ')' and slice out ppid without splitting.
+                buf = _read_stat(name)
+                start = buf.rindex(b")") + 4
+                parent = int(buf[start:buf.index(b" ", start)])
+            except Exception:
+                continue
+            yield int(name), parent
+
+def _walk_proc() -> tuple[ProcTable, dict[int,list[int]]]:
+    # Only stat is read per PID; cmdlines are resolved lazily for the PIDs we display.
+    # ppids live only in the table's column; no separate pid->ppid dict.
+    table = ProcTable()
+    children: dict[int,list[int]] = {}
+    for pid, parent in iter_pid_stat():
+        table.add(pid, parent)
+        children.setdefault(parent, []).append(pid)
+    return table, children
+
+@lru_cache(maxsize=1)
+def _pid_max() -> int:
+    try:
+        with open("/proc/sys/kernel/pid_max", "rb") as f:
+            return int(f.read())
     except Exception:
-        return None
+        return 1 << 22  # PID_MAX_LIMIT on 64-bit Linux
 
-def build_ppid_map() -> tuple[dict[int,int], dict[int,ProcInfo]]:
-    ppid: dict[int,int] = {}
-    infos: dict[int,ProcInfo] = {}
-    for d in os.listdir("/proc"):
-        if not d.isdigit():
-            continue
-        pid = int(d)
+def descendants(roots: Iterable[int], children: dict[int,list[int]]) -> set[int]:
+    # Visited set is a bitmap indexed by PID (no hashing); `order` doubles as the BFS queue.
+    seen = bytearray((_pid_max() >> 3) + 1)
+    order: list[int] = []
+    for r in roots:
+        if not seen[r >> 3] & (1 << (r & 7)):
+            seen[r >> 3] |= 1 << (r & 7)
+            order.append(r)
+
+    i = 0
+    while i < len(order):
+        for ch in children.get(order[i], ()):
+            if not seen[ch >> 3] & (1 << (ch & 7)):
+                seen[ch >> 3] |= 1 << (ch & 7)
+                order.append(ch)
+        i += 1
+    return set(order)
+
+@lru_cache(maxsize=1)
+def _has_children_files() -> bool:
+    # Needs CONFIG_PROC_CHILDREN; the main thread's tid equals our pid.
+    return os.path.exists(f"/proc/self/task/{os.getpid()}/children")
+
+def _read_children(pid: int) -> list[int]:
+    # Each thread lists the children it forked, so read every task of the process.
+    try:
+        tids = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return []
+    out: list[int] = []
+    for tid in tids:
         try:
-            stat = Path(f"/proc/{pid}/stat").read_text()
-            parts = stat.split()
-            parent = int(parts[3])
-            ppid[pid] = parent
-            infos[pid] = ProcInfo(pid=pid, ppid=parent, cmdline=_read_cmdline(pid), exe=_read_exe(pid), cwd=_read_cwd(pid))
-        except Exception:
+            with open(f"/proc/{pid}/task/{tid}/children", "rb") as f:
+                out.extend(map(int, f.read().split()))
+        except OSError:
             continue
-    return ppid, infos
-
-def descendants(roots: Iterable[int], ppid_map: dict[int,int]) -> set[int]:
-    children: dict[int, list[int]] = defaultdict(list)
-    for pid, parent in ppid_map.items():
-        children[parent].append(pid)
+    return out
 
+def descendants_via_children(roots: Iterable[int]) -> set[int] | None:
+    # O(descendants) reads instead of a full /proc walk; None if the kernel lacks the files.
+    if not _has_children_files():
+        return None
     seen: set[int] = set()
-    q: deque[int] = deque()
+    queue: list[int] = []
     for r in roots:
         if r not in seen:
             seen.add(r)
-            q.append(r)
-
-    while q:
-        cur = q.popleft()
-        for ch in children.get(cur, []):
+            queue.append(r)
+    i = 0
+    while i < len(queue):
+        for ch in _read_children(queue[i]):
             if ch not in seen:
                 seen.add(ch)
-                q.append(ch)
+                queue.append(ch)
+        i += 1
     return seen
 
-def summarize_pids(pids: Iterable[int], infos: dict[int,ProcInfo], max_items: int = 8) -> list[str]:
+def summarize_pids(pids: Iterable[int], table: ProcTable, max_items: int = 8) -> list[str]:
     # Heuristic: group by first token of cmdline
-    buckets: dict[str, int] = defaultdict(int)
+    known = table.pid_to_idx
+    buckets: Counter[str] = Counter()
     for pid in pids:
-        cmd = infos.get(pid).cmdline if pid in infos else ""
-        head = cmd.strip().split(" ", 1)[0] if cmd.strip() else "(empty)"
-        buckets[head] += 1
-    items = sorted(buckets.items(), key=lambda kv: (-kv[1], kv[0]))[:max_items]
+        buckets[table.head(pid) if pid in known else "(empty)"] += 1
+    items = heapq.nsmallest(max_items, buckets.items(), key=lambda kv: (-kv[1], kv[0]))
     return [f"{k} x{v}" for k,v in items]
+
+PARALLEL_SIGNAL_THRESHOLD = 16
+
+def _try_kill(pid: int, sig: int) -> bool:
+    try:
+        os.kill(pid, sig)
+        return True
+    except Exception:
+        return False
+
+def _pgid_or_none(pid: int) -> int | None:
+    try:
+        return os.getpgid(pid)
+    except Exception:
+        return None
+
+def _kill_each(pids: list[int], sig: int) -> int:
+    if len(pids) <= PARALLEL_SIGNAL_THRESHOLD:
+        return sum(_try_kill(pid, sig) for pid in pids)
+    # os.kill releases the GIL, so large desks are signalled concurrently.
+    with ThreadPoolExecutor(max_workers=min(32, len(pids))) as pool:
+        return sum(pool.map(lambda pid: _try_kill(pid, sig), pids))
+
+def _is_session_leader(pgid: int) -> bool:
+    try:
+        return os.getsid(pgid) == pgid
+    except Exception:
+        return False
+
+def signal_pids(pids: Iterable[int], sig: int, exclude: Iterable[int] = (), roots: Iterable[int] = ()) -> int:
+    # Best-effort delivery; returns how many PIDs were actually signalled.
+    # ``roots`` are the tmux pane PIDs; their groups are never killpg'd (see below).
+    skip = set(exclude)
+    no_group = set(roots)
+    targets = set(pids).difference(skip)
+
+    groups: dict[int, list[int]] = defaultdict(list)
+    loose: list[int] = []
+    for pid in targets:
+        pgid = _pgid_or_none(pid)
+        if pgid is None:
+            loose.append(pid)
+        else:
+            groups[pgid].append(pid)
+
+    # Never signal a process group that an excluded PID (i.e. us) belongs to.
+    busy = {_pgid_or_none(pid) for pid in skip}
+
+    sent = 0
+    for pgid, members in groups.items():
+        # A multi-process job led by a desk process gets a single killpg,
+        # which also stops/continues the job as one unit. Not so for a pane's own
+        # group (pane root / session leader): tmux answers the root stopping with
+        # killpg(pane_pid, SIGCONT), so a group-wide SIGSTOP would never stick.
+        if (
+            len(members) > 1
+            and pgid in targets
+            and pgid not in busy
+            and pgid not in no_group
+            and not _is_session_leader(pgid)
+        ):
+            try:
+                os.killpg(pgid, sig)
+                sent += len(members)
+                continue
+            except Exception:
+                pass
+        loose.extend(members)
+
+    return sent + _kill_each(loose, sig)
@@ -1,14 +1,23 @@
 from __future__ import annotations
 
-import json
+import atexit
+import base64
+import copy
 import os
+import secrets
+import sys
+import threading
 import time
+from collections import deque
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional
 
 import fcntl
 
+from .util import dump_json, load_json, map_file
+
 # --- storage locations ---
 
 DEFAULT_STATE_DIR_CANDIDATES = [
@@ -20,12 +29,19 @@ DEFAULT_STATE_DIR_CANDIDATES = [
 DEFAULT_STATE_DIR = next(p for p in DEFAULT_STATE_DIR_CANDIDATES if p is not None)
 
 BOARD_FILE = "board.json"
-LOCK_FILE = "board.lock"
 
 
-def _now_iso() -> str:
-    # ISO 8601 with timezone offset if available
-    return time.strftime("%Y-%m-%dT%H:%M:%S%z")
+def iso_timestamp(sec: float | None = None) -> str:
+    # ISO 8601 with timezone offset; same output as strftime("%Y-%m-%dT%H:%M:%S%z"),
+    # but the offset comes from tm_gmtoff so DST changes are still picked up.
+    t = time.localtime(sec)
+    off = t.tm_gmtoff // 60
+    sign = "-" if off < 0 else "+"
+    off = abs(off)
+    return (
+        f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}"
+        f"{sign}{off // 60:02d}{off % 60:02d}"
+    )
 
 
 def _iso_gt(a: str, b: str) -> bool:
@@ -37,6 +53,18 @@ def _iso_gt(a: str, b: str) -> bool:
     return a > b
 
 
+def _read_all(fd: int) -> bytes:
+    return os.pread(fd, os.fstat(fd).st_size, 0)
+
+
+def _write_all(fd: int, payload: bytes) -> None:
+    # pwrite from offset 0; loop in case the kernel takes it in pieces.
+    view = memoryview(payload)
+    off = 0
+    while off < len(view):
+        off += os.pwrite(fd, view[off:], off)
+
+
 @dataclass
 class DeskState:
     """A 'desk' is a virtual user slot (co-working style) owned by a NAME."""
@@ -62,30 +90,183 @@ class DeskState:
         return _iso_gt(self.saved_at, self.started_at)
 
 
+def _desk_from_dict(name: str, cur: Dict[str, Any]) -> DeskState:
+    return DeskState(
+        name=name,
+        created_at=str(cur.get("created_at", "")),
+        updated_at=str(cur.get("updated_at", "")),
+        status=str(cur.get("status", "prepared")),
+        prepared_at=str(cur.get("prepared_at", "")),
+        started_at=str(cur.get("started_at", "")),
+        saved_at=str(cur.get("saved_at", "")),
+        stopped_at=str(cur.get("stopped_at", "")),
+        note=str(cur.get("note", "")),
+        tmux_server=str(cur.get("tmux_server", "")),
+        tmux_session=str(cur.get("tmux_session", "")),
+        workdir=str(cur.get("workdir", "")),
+    )
+
+
+class DeskBoardView:
+    """Read-only, dict-like view of the board returned by ``Board.get_all``.
+
+    Rows stay as the raw board dicts; a ``DeskState`` is only built when a desk is
+    looked up, and ``column(field)`` gives one field for every desk without building any.
+    """
+
+    __slots__ = ("_names", "_rows", "_pos", "_columns")
+
+    def __init__(self, desks: Dict[str, Dict[str, Any]]) -> None:
+        self._names = list(desks)
+        self._rows = list(desks.values())
+        self._pos = {name: i for i, name in enumerate(self._names)}
+        self._columns: Dict[str, list[str]] = {}
+
+    def column(self, field: str) -> list[str]:
+        """Values of ``field`` for every desk, in ``keys()`` order."""
+        col = self._columns.get(field)
+        if col is None:
+            default = "prepared" if field == "status" else ""
+            col = self._columns[field] = [str(cur.get(field, default)) for cur in self._rows]
+        return col
+
+    def __getitem__(self, name: str) -> DeskState:
+        return _desk_from_dict(name, self._rows[self._pos[name]])
+
+    def get(self, name: str, default: DeskState | None = None) -> DeskState | None:
+        i = self._pos.get(name)
+        return default if i is None else _desk_from_dict(name, self._rows[i])
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._pos
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def keys(self) -> list[str]:
+        return list(self._names)
+
+    def values(self) -> Iterator[DeskState]:
+        return (_desk_from_dict(n, cur) for n, cur in zip(self._names, self._rows))
+
+    def items(self) -> Iterator[tuple[str, DeskState]]:
+        return ((n, _desk_from_dict(n, cur)) for n, cur in zip(self._names, self._rows))
+
+
 class Board:
     """Shared registry of desks."""
 
     def __init__(self, state_dir: Path | None = None) -> None:
         self.state_dir = state_dir or DEFAULT_STATE_DIR
         self.state_dir.mkdir(parents=True, exist_ok=True)
-        self.lock_path = self.state_dir / LOCK_FILE
         self.board_path = self.state_dir / BOARD_FILE
-
-    def _load_unlocked(self) -> Dict[str, Any]:
-        if not self.board_path.exists():
-            return {"version": 1, "desks": {}}
+        # (raw bytes, parsed board) from the last load or commit. Keyed on the bytes
+        # themselves: files are rewritten in place, so inode/mtime/size cannot tell two
+        # same-size writes within one timestamp tick apart. Never mutate the parse.
+        self._cache: tuple[bytes, Dict[str, Any]] | None = None
+        self._f: BinaryIO | None = None
+        # (raw bytes, view) handed out by the last get_all(); reused while the file still holds them.
+        self._snap: tuple[bytes, DeskBoardView] | None = None
+
+    def _file(self) -> BinaryIO:
+        # board.json is its own lock: lockf the fd, then read/rewrite it in place.
+        # The fd is kept open across calls; reopen only if the path now names another file.
+        if self._f is not None:
+            try:
+                if os.stat(self.board_path).st_ino == os.fstat(self._f.fileno()).st_ino:
+                    return self._f
+            except FileNotFoundError:
+                pass
+            self._f.close()
+        fd = os.open(self.board_path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._f = os.fdopen(fd, "r+b")
+        return self._f
+
+    @contextmanager
+    def _locked(self, op: int) -> Iterator[BinaryIO]:
+        # POSIX record lock (works over NFS, unlike flock). These are per process, not
+        # per fd: closing any fd on board.json drops them, hence the single kept-open fd.
+        f = self._file()
+        fcntl.lockf(f, op)
         try:
-            return json.loads(self.board_path.read_text(encoding="utf-8"))
+            yield f
+        finally:
+            fcntl.lockf(f, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        """Release the board fd (it is reopened on the next call)."""
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def _load_shared_unlocked(self, f: BinaryIO) -> tuple[bytes | None, Dict[str, Any]]:
+        """(raw bytes, cached parse) of the locked board; raw is None if unusable.
+
+        The parse is shared with the cache, so callers must not mutate it.
+        """
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return b"", {"version": 1, "desks": {}}
+        with map_file(f.fileno(), size) as raw:
+            # A hit costs one compare against the mapping, no read() copy and no parse.
+            if self._cache is not None and self._cache[0] == raw:
+                return self._cache
+            try:
+                data = load_json(raw)
+            except Exception:
+                # if corrupted, don't crash; keep a backup of the bytes we already mapped
+                bak = self.state_dir / f"board.corrupt.{int(time.time())}.json"
+                bak.write_bytes(raw)
+                return None, {"version": 1, "desks": {}}
+            self._cache = (bytes(raw), data)
+        return self._cache
+
+    def _read_for_update(self) -> tuple[bytes, Dict[str, Any]]:
+        """Board bytes as read under LOCK_SH, plus a private parsed copy.
+
+        Writers parse, mutate and serialize with no lock held; ``_commit`` then
+        checks the bytes are still current under LOCK_EX.
+        """
+        with self._locked(fcntl.LOCK_SH) as f:
+            st = os.fstat(f.fileno())
+            raw = os.pread(f.fileno(), st.st_size, 0)
+        if not raw:
+            return raw, {"version": 1, "desks": {}}
+        if self._cache is not None and self._cache[0] == raw:
+            return raw, copy.deepcopy(self._cache[1])
+        try:
+            data = load_json(raw)
         except Exception:
             # if corrupted, don't crash; keep a backup
             bak = self.state_dir / f"board.corrupt.{int(time.time())}.json"
-            bak.write_text(self.board_path.read_text(encoding="utf-8", errors="ignore"), encoding="utf-8")
-            return {"version": 1, "desks": {}}
+            bak.write_bytes(raw)
+            return raw, {"version": 1, "desks": {}}
+        self._cache = (raw, data)
+        return raw, copy.deepcopy(data)
+
+    def _commit(self, raw: bytes, data: Dict[str, Any]) -> bool:
+        """Write ``data`` if board.json still holds ``raw``; False if another writer got in first."""
+        payload = dump_json(data)
+        with self._locked(fcntl.LOCK_EX) as f:
+            if _read_all(f.fileno()) != raw:
+                return False
+            self._save_unlocked(f, payload)
+        self._cache = (payload, data)
+        self._snap = None
+        return True
 
-    def _save_unlocked(self, data: Dict[str, Any]) -> None:
-        tmp = self.state_dir / f".board.{os.getpid()}.tmp"
-        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
-        tmp.replace(self.board_path)
+    def _save_unlocked(self, f: BinaryIO, payload: bytes) -> None:
+        # Safe in place: every reader and writer holds a lock on this same file.
+        # Raw fd calls, no buffered-file flush; fdatasync skips the inode-metadata flush.
+        # Write first, then cut the tail: an interrupted save leaves unparseable JSON
+        # (backed up as .corrupt) rather than an empty file that reads as an empty board.
+        fd = f.fileno()
+        _write_all(fd, payload)
+        os.ftruncate(fd, len(payload))
+        os.fdatasync(fd)
 
     def upsert(
         self,
@@ -101,15 +282,15 @@ class Board:
         tmux_session: str | None = None,
         workdir: str | None = None,
     ) -> DeskState:
-        self.lock_path.touch(exist_ok=True)
-        with open(self.lock_path, "r+") as f:
-            fcntl.flock(f, fcntl.LOCK_EX)
-            data = self._load_unlocked()
+        # Optimistic: build the new board with no lock held, retry if a writer raced us.
+        while True:
+            raw, data = self._read_for_update()
             desks = data.setdefault("desks", {})
             cur = desks.get(name) or {}
+            before = dict(cur) if name in desks else None
 
-            created_at = cur.get("created_at") or _now_iso()
-            updated_at = _now_iso()
+            created_at = cur.get("created_at") or iso_timestamp()
+            updated_at = iso_timestamp()
 
             if status is not None:
                 cur["status"] = status
@@ -133,54 +314,93 @@ class Board:
                 cur["workdir"] = workdir
 
             cur["created_at"] = created_at
-            cur["updated_at"] = updated_at
 
+            # Nothing but updated_at would move: leave board.json (and its mtime) alone.
+            if cur == before:
+                break
+            cur["updated_at"] = updated_at
             desks[name] = cur
-            self._save_unlocked(data)
-            fcntl.flock(f, fcntl.LOCK_UN)
+            if self._commit(raw, data):
+                break
 
-        return self.get(name) or DeskState(name=name, created_at=created_at, updated_at=updated_at)
+        return _desk_from_dict(name, cur)
 
-    def get(self, name: str) -> DeskState | None:
-        return self.get_all().get(name)
+    def upsert_status(self, name: str, status: str, ts_field: str | None = None, ts: str | None = None) -> DeskState:
+        """Fast path for the common ``upsert(name, status=..., <ts_field>=ts)`` call.
 
-    def get_all(self) -> Dict[str, DeskState]:
-        self.lock_path.touch(exist_ok=True)
-        with open(self.lock_path, "r+") as f:
-            fcntl.flock(f, fcntl.LOCK_SH)
-            data = self._load_unlocked()
-            desks = data.get("desks") or {}
-            out: Dict[str, DeskState] = {}
-            for name, cur in desks.items():
-                out[name] = DeskState(
-                    name=name,
-                    created_at=str(cur.get("created_at", "")),
-                    updated_at=str(cur.get("updated_at", "")),
-                    status=str(cur.get("status", "prepared")),
-                    prepared_at=str(cur.get("prepared_at", "")),
-                    started_at=str(cur.get("started_at", "")),
-                    saved_at=str(cur.get("saved_at", "")),
-                    stopped_at=str(cur.get("stopped_at", "")),
-                    note=str(cur.get("note", "")),
-                    tmux_server=str(cur.get("tmux_server", "")),
-                    tmux_session=str(cur.get("tmux_session", "")),
-                    workdir=str(cur.get("workdir", "")),
-                )
-            fcntl.flock(f, fcntl.LOCK_UN)
-        return out
+        ``ts`` defaults to now; pass it when the same timestamp was already used elsewhere.
+        """
+        while True:
+            raw, data = self._read_for_update()
+            desks = data.setdefault("desks", {})
+            before = dict(desks[name]) if name in desks else None
+            cur = desks.setdefault(name, {})
+            now = iso_timestamp()
+            cur["status"] = status
+            if ts_field:
+                cur[ts_field] = ts if ts is not None else now
+            cur["created_at"] = cur.get("created_at") or now
+            if cur == before:
+                break
+            cur["updated_at"] = now
+            if self._commit(raw, data):
+                break
+        return _desk_from_dict(name, cur)
+
+    def get(self, name: str, consistent: bool = False) -> DeskState | None:
+        return self.get_all(consistent).get(name)
+
+    def get_all(self, consistent: bool = False) -> DeskBoardView:
+        """Snapshot of every desk.
+
+        By default the previous snapshot is returned without taking the lock when
+        board.json still holds exactly the bytes it was built from. ``consistent=True``
+        always reads under the lock.
+        """
+        if not consistent and self._snap is not None:
+            # Unlocked pread, not mmap: a concurrent truncate must not SIGBUS us. A torn
+            # read can only match if those bytes really were the whole file.
+            if _read_all(self._file().fileno()) == self._snap[0]:
+                return self._snap[1]
+        with self._locked(fcntl.LOCK_SH) as f:
+            raw, data = self._load_shared_unlocked(f)
+        view = DeskBoardView(data.get("desks") or {})
+        self._snap = (raw, view) if raw is not None else None
+        return view
+
+    def get_or_create(self, name: str, defaults: Callable[[], Dict[str, str]]) -> DeskState:
+        """Return the desk, creating it from ``defaults()`` first if missing.
+
+        ``defaults`` is only called when the row has to be created, so any side
+        effects of computing it (e.g. creating a workdir) are skipped for existing desks.
+        """
+        fields: Dict[str, str] | None = None
+        while True:
+            raw, data = self._read_for_update()
+            desks = data.setdefault("desks", {})
+            cur = desks.get(name)
+            if cur is not None:
+                break
+            if fields is None:
+                fields = defaults()
+            now = iso_timestamp()
+            cur = {**fields, "created_at": now, "updated_at": now}
+            desks[name] = cur
+            if self._commit(raw, data):
+                break
+        return _desk_from_dict(name, cur)
 
     def remove(self, name: str) -> bool:
-        self.lock_path.touch(exist_ok=True)
-        with open(self.lock_path, "r+") as f:
-            fcntl.flock(f, fcntl.LOCK_EX)
-            data = self._load_unlocked()
+        while True:
+            raw, data = self._read_for_update()
             desks = data.get("desks") or {}
             existed = name in desks
-            if existed:
-                desks.pop(name, None)
-                data["desks"] = desks
-                self._save_unlocked(data)
-            fcntl.flock(f, fcntl.LOCK_UN)
+            if not existed:
+                break
+            desks.pop(name, None)
+            data["desks"] = desks
+            if self._commit(raw, data):
+                break
         return existed
 
 
@@ -198,10 +418,22 @@ class SaveStore:
         return self.save_dir / f"{name}.{safe_ts}.json"
 
     def write(self, name: str, ts: str, payload: dict[str, Any]) -> Path:
+        # Saves are never rewritten, so create the final file directly (no tmp+rename);
+        # a second save within the same second gets a .1, .2, ... suffix instead.
         path = self.save_path(name, ts)
-        tmp = path.with_suffix(path.suffix + f".{os.getpid()}.tmp")
-        tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
-        tmp.replace(path)
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_DSYNC", 0)
+        stem, n = path.stem, 0
+        while True:
+            try:
+                fd = os.open(path, flags, 0o644)
+                break
+            except FileExistsError:
+                n += 1
+                path = path.with_name(f"{stem}.{n}.json")
+        try:
+            _write_all(fd, dump_json(payload))
+        finally:
+            os.close(fd)
         return path
 
 
@@ -216,9 +448,20 @@ class Message:
     reply_to: str = ""  # id of parent message, empty if top-level
 
 
+def _message_from_dict(m: Dict[str, Any]) -> Message:
+    return Message(
+        id=str(m.get("id", "")),
+        author=str(m.get("author", "")),
+        text=str(m.get("text", "")),
+        created_at=str(m.get("created_at", "")),
+        reply_to=str(m.get("reply_to", "")),
+    )
+
+
 MESSAGES_FILE = "messages.json"
 MESSAGES_LOCK = "messages.lock"
 MESSAGE_EXPIRY_DAYS = 7
+MESSAGE_MAX_COUNT = 100
 
 
 def _is_older_than_days(iso_time: str, days: int) -> bool:
@@ -249,26 +492,59 @@ class MessageBoard:
         self.state_dir.mkdir(parents=True, exist_ok=True)
         self.lock_path = self.state_dir / MESSAGES_LOCK
         self.messages_path = self.state_dir / MESSAGES_FILE
+        # id -> Message from the last get_all(); dropped whenever we write.
+        self._by_id: Dict[str, Message] | None = None
+        self._cache: tuple[bytes, Dict[str, Any]] | None = None
+        # Write-behind queue: post() appends here and a flusher thread writes batches.
+        self._pending: list[dict] = []
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # held across take-batch + write, keeps FIFO
+        self._wake = threading.Event()
+        self._flusher: threading.Thread | None = None
 
     def _load_unlocked(self) -> Dict[str, Any]:
-        if not self.messages_path.exists():
-            return {"version": 1, "messages": []}
+        return copy.deepcopy(self._load_shared_unlocked())
+
+    def _load_shared_unlocked(self) -> Dict[str, Any]:
+        # The cached parse itself, not a copy: read-only callers must not mutate it.
+        # Cached by content (see Board._cache): messages.json is rewritten in place too.
         try:
-            return json.loads(self.messages_path.read_text(encoding="utf-8"))
-        except Exception:
-            bak = self.state_dir / f"messages.corrupt.{int(time.time())}.json"
-            bak.write_text(self.messages_path.read_text(encoding="utf-8", errors="ignore"), encoding="utf-8")
+            fd = os.open(self.messages_path, os.O_RDONLY)
+        except FileNotFoundError:
             return {"version": 1, "messages": []}
+        try:
+            size = os.fstat(fd).st_size
+            if size == 0:
+                return {"version": 1, "messages": []}
+            with map_file(fd, size) as raw:
+                if self._cache is not None and self._cache[0] == raw:
+                    return self._cache[1]
+                try:
+                    data = load_json(raw)
+                except Exception:
+                    bak = self.state_dir / f"messages.corrupt.{int(time.time())}.json"
+                    bak.write_bytes(raw)
+                    return {"version": 1, "messages": []}
+                self._cache = (bytes(raw), data)
+        finally:
+            os.close(fd)
+        return data
 
     def _save_unlocked(self, data: Dict[str, Any]) -> None:
-        tmp = self.state_dir / f".messages.{os.getpid()}.tmp"
-        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
-        tmp.replace(self.messages_path)
+        # Best-effort board: write in place under the caller's flock, no tmp+rename or fsync.
+        # Write before truncating (as Board does): a torn write must not leave an empty
+        # file, which would load as a valid empty board with no .corrupt backup.
+        payload = dump_json(data)
+        fd = os.open(self.messages_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            _write_all(fd, payload)
+            os.ftruncate(fd, len(payload))
+        finally:
+            os.close(fd)
 
     def _generate_id(self) -> str:
-        import random
-        import string
-        return "".join(random.choices(string.ascii_lowercase + string.digits, k=6))
+        # 6 base32 chars = 30 random bits from the OS CSPRNG, in [a-z2-7].
+        return base64.b32encode(secrets.token_bytes(4))[:6].decode("ascii").lower()
 
     def _cleanup_expired(self, messages: list[dict]) -> list[dict]:
         """Remove messages older than MESSAGE_EXPIRY_DAYS."""
@@ -278,79 +554,131 @@ class MessageBoard:
         ]
 
     def post(self, author: str, text: str, reply_to: str = "") -> Message:
-        """Post a new message or reply."""
-        self.lock_path.touch(exist_ok=True)
-        with open(self.lock_path, "r+") as f:
-            fcntl.flock(f, fcntl.LOCK_EX)
-            data = self._load_unlocked()
-            messages = data.setdefault("messages", [])
-
-            # Auto-remove messages older than 7 days
-            messages = self._cleanup_expired(messages)
-
-            msg_id = self._generate_id()
-            created_at = _now_iso()
-
-            msg_data = {
-                "id": msg_id,
-                "author": author,
-                "text": text,
-                "created_at": created_at,
-                "reply_to": reply_to,
-            }
-            messages.append(msg_data)
-
-            # Keep only last 100 messages
-            if len(messages) > 100:
-                messages = messages[-100:]
-
-            data["messages"] = messages
-            self._save_unlocked(data)
-            fcntl.flock(f, fcntl.LOCK_UN)
-
-        return Message(
-            id=msg_id,
-            author=author,
-            text=text,
-            created_at=created_at,
-            reply_to=reply_to,
-        )
+        """Post a new message or reply (written to disk by the background flusher)."""
+        msg_data = {
+            "id": self._generate_id(),
+            "author": author,
+            "text": text,
+            "created_at": iso_timestamp(),
+            "reply_to": reply_to,
+        }
+        with self._pending_lock:
+            self._pending.append(msg_data)
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="hotdesk-messages", daemon=True)
+                self._flusher.start()
+                atexit.register(self._flush_at_exit)
+        self._by_id = None
+        self._wake.set()
+
+        return Message(**msg_data)
+
+    def _flush_loop(self) -> None:
+        while True:
+            self._wake.wait()
+            # Give a burst of posts 50 ms to pile up, then write them in one go.
+            time.sleep(0.05)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # flush() has put the batch back; keep the thread alive so the next
+                # post (or the exit flush) retries it.
+                pass
+
+    def _flush_at_exit(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            with self._pending_lock:
+                lost = len(self._pending)
+            sys.stderr.write(f"hotdesk: could not write {lost} queued message(s): {e}\n")
+
+    def flush(self) -> None:
+        """Write queued posts to disk now."""
+        with self._flush_lock:
+            with self._pending_lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                self.lock_path.touch(exist_ok=True)
+                with open(self.lock_path, "r+") as f:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                    # Only the top-level list is replaced, so a shallow copy of the cached parse will do.
+                    data = dict(self._load_shared_unlocked())
+
+                    # Auto-remove messages older than 7 days, then keep only the last 100:
+                    # the bounded deque drops the oldest as the batch goes in, no slice copy.
+                    messages = deque(self._cleanup_expired(data.get("messages") or []), maxlen=MESSAGE_MAX_COUNT)
+                    messages.extend(batch)
+
+                    data["messages"] = list(messages)
+                    self._save_unlocked(data)
+                    self._by_id = None
+                    fcntl.flock(f, fcntl.LOCK_UN)
+            except BaseException:
+                # Not written: requeue ahead of anything posted meanwhile, keeping FIFO order.
+                with self._pending_lock:
+                    self._pending[:0] = batch
+                raise
+
+    def _load_raw_messages(self) -> list[dict]:
+        """Raw message dicts on disk plus queued posts, oldest first. Do not mutate them."""
+        # Under _flush_lock a post is either on disk or still in _pending, never neither.
+        # Take it before the flock, same order as flush(), or the two deadlock.
+        with self._flush_lock:
+            self.lock_path.touch(exist_ok=True)
+            with open(self.lock_path, "r+") as f:
+                fcntl.flock(f, fcntl.LOCK_SH)
+                data = self._load_shared_unlocked()
+                fcntl.flock(f, fcntl.LOCK_UN)
+            with self._pending_lock:
+                pending = list(self._pending)
+        messages = data.get("messages") or []
+        if not pending:
+            return messages
+        # Show exactly what flush() will write: expired dropped, capped at MESSAGE_MAX_COUNT.
+        return list(deque(self._cleanup_expired(messages + pending), maxlen=MESSAGE_MAX_COUNT))
 
     def get_all(self, latest_first: bool = True) -> list[Message]:
         """Get all messages, sorted by time (latest first by default)."""
-        self.lock_path.touch(exist_ok=True)
-        with open(self.lock_path, "r+") as f:
-            fcntl.flock(f, fcntl.LOCK_SH)
-            data = self._load_unlocked()
-            messages = data.get("messages") or []
-            out: list[Message] = []
-            for m in messages:
-                created_at = str(m.get("created_at", ""))
-                # Skip expired messages in output
-                if _is_older_than_days(created_at, MESSAGE_EXPIRY_DAYS):
-                    continue
-                out.append(Message(
-                    id=str(m.get("id", "")),
-                    author=str(m.get("author", "")),
-                    text=str(m.get("text", "")),
-                    created_at=created_at,
-                    reply_to=str(m.get("reply_to", "")),
-                ))
-            fcntl.flock(f, fcntl.LOCK_UN)
+        out: list[Message] = []
+        by_id: Dict[str, Message] = {}
+        for m in self._load_raw_messages():
+            # Skip expired messages in output
+            if _is_older_than_days(str(m.get("created_at", "")), MESSAGE_EXPIRY_DAYS):
+                continue
+            msg = _message_from_dict(m)
+            out.append(msg)
+            by_id.setdefault(msg.id, msg)
+        self._by_id = by_id
 
         # Sort by created_at (ISO format sorts lexicographically)
         out.sort(key=lambda m: m.created_at, reverse=latest_first)
         return out
 
+    def index(self) -> Dict[str, Message]:
+        """Map of message id -> Message, reusing the one built by the last get_all()."""
+        if self._by_id is None:
+            self.get_all(latest_first=False)
+        return self._by_id or {}
+
     def get_by_id(self, msg_id: str) -> Message | None:
         """Get a message by ID."""
-        for m in self.get_all(latest_first=False):
-            if m.id == msg_id:
-                return m
+        if self._by_id is not None:
+            return self._by_id.get(msg_id)
+        # Only build a Message for the hit.
+        for m in self._load_raw_messages():
+            if str(m.get("id", "")) == msg_id and not _is_older_than_days(
+                str(m.get("created_at", "")), MESSAGE_EXPIRY_DAYS
+            ):
+                return _message_from_dict(m)
         return None
 
     def clear_old(self, keep_last: int = 50) -> int:
         """Remove old messages, keeping the last N."""
+        self.flush()
         self.lock_path.touch(exist_ok=True)
         with open(self.lock_path, "r+") as f:
             fcntl.flock(f, fcntl.LOCK_EX)
@@ -367,5 +695,6 @@ class MessageBoard:
 
             data["messages"] = messages
             self._save_unlocked(data)
+            self._by_id = None
             fcntl.flock(f, fcntl.LOCK_UN)
         return original_count - len(messages)
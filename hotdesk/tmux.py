@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import List, Optional
 
 from .util import run, which
@@ -14,7 +15,9 @@ class PaneInfo:
     current_command: str
     title: str
 
+@lru_cache(maxsize=1)
 def require_tmux() -> None:
+    # tmux cannot appear or vanish mid-command; only a successful lookup is cached.
     if which("tmux") is None:
         raise RuntimeError("tmux not found. Please install tmux first.")
 
@@ -23,7 +26,11 @@ def has_session(server: str, session: str) -> bool:
     res = run(["tmux", "-L", server, "has-session", "-t", session], check=False)
     return res.returncode == 0
 
-def list_panes(server: str, session: str | None = None) -> list[PaneInfo]:
+def try_list_panes(server: str, session: str | None = None) -> list[PaneInfo] | None:
+    """List panes, or None if the server/session does not exist.
+
+    Doubles as an activity check, saving a separate has-session call.
+    """
     require_tmux()
     target = session or ""
     fmt = "#{session_name}\t#{window_index}\t#{pane_index}\t#{pane_pid}\t#{pane_current_command}\t#{pane_title}"
@@ -32,9 +39,21 @@ def list_panes(server: str, session: str | None = None) -> list[PaneInfo]:
         argv = ["tmux", "-L", server, "list-panes", "-t", target, "-a", "-F", fmt]
     res = run(argv, check=False)
     if res.returncode != 0:
-        return []
+        return None
+    try:
+        # Fast path: one C-level split per line, no per-line exception frame.
+        return [
+            PaneInfo(p[0], int(p[1]), int(p[2]), int(p[3]), p[4], p[5])
+            for p in (ln.split("\t", 5) for ln in res.stdout.split("\n"))
+            if len(p) == 6
+        ]
+    except ValueError:
+        return _parse_panes_slow(res.stdout)
+
+def _parse_panes_slow(stdout: str) -> list[PaneInfo]:
+    # Line-by-line parse that skips malformed lines instead of failing the batch.
     out: list[PaneInfo] = []
-    for line in res.stdout.splitlines():
+    for line in stdout.splitlines():
         parts = line.split("\t")
         if len(parts) < 6:
             continue
@@ -53,6 +72,19 @@ def list_panes(server: str, session: str | None = None) -> list[PaneInfo]:
             continue
     return out
 
+def list_panes(server: str, session: str | None = None) -> list[PaneInfo]:
+    return try_list_panes(server, session) or []
+
+def list_panes_all(server: str) -> dict[str, list[PaneInfo]] | None:
+    """All panes on a server grouped by session, in one tmux call; None if the server is down."""
+    panes = try_list_panes(server)
+    if panes is None:
+        return None
+    out: dict[str, list[PaneInfo]] = {}
+    for p in panes:
+        out.setdefault(p.session_name, []).append(p)
+    return out
+
 def new_or_attach(server: str, session: str, workdir: str | None = None) -> None:
     require_tmux()
     argv = ["tmux", "-L", server, "new", "-A", "-s", session]
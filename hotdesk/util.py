@@ -1,10 +1,17 @@
 from __future__ import annotations
 
+import mmap
 import os
 import shlex
 import subprocess
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Sequence
+from typing import Any, Iterator, Sequence
+
+try:
+    import orjson
+except ImportError:  # optional speedup: pip install hotdesk[fast]
+    orjson = None
 
 @dataclass
 class CmdResult:
@@ -17,17 +24,50 @@ def shquote(argv: Sequence[str]) -> str:
     return " ".join(shlex.quote(a) for a in argv)
 
 def run(argv: Sequence[str], *, check: bool = False, capture: bool = True, text: bool = True, env: dict[str,str] | None = None) -> CmdResult:
-    proc = subprocess.run(
-        list(argv),
-        check=False,
-        capture_output=capture,
-        text=text,
-        env={**os.environ, **(env or {})},
-    )
+    args = list(argv)
+    if env is not None:
+        merged = os.environ.copy()
+        merged.update(env)
+        env = merged
+    pipe = subprocess.PIPE if capture else None
+    with subprocess.Popen(args, stdout=pipe, stderr=pipe, text=text, env=env) as proc:
+        out, err = proc.communicate()
     if check and proc.returncode != 0:
-        raise subprocess.CalledProcessError(proc.returncode, list(argv), output=proc.stdout, stderr=proc.stderr)
-    return CmdResult(list(argv), proc.returncode, proc.stdout or "", proc.stderr or "")
+        raise subprocess.CalledProcessError(proc.returncode, args, output=out, stderr=err)
+    return CmdResult(args, proc.returncode, out or "", err or "")
+
+_which_cache: dict[str, str] = {}
 
 def which(cmd: str) -> str | None:
-    from shutil import which as _which
-    return _which(cmd)
+    # Hits are stable for the life of a CLI run; misses are not cached so a
+    # later install on PATH is still picked up.
+    hit = _which_cache.get(cmd)
+    if hit is None:
+        from shutil import which as _which
+        hit = _which(cmd)
+        if hit is not None:
+            _which_cache[cmd] = hit
+    return hit
+
+def dump_json(obj: Any) -> bytes:
+    """Serialize to indented UTF-8 JSON bytes (orjson when available), newline-terminated."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2) + b"\n"
+    import json
+    return (json.dumps(obj, ensure_ascii=False, indent=2) + "\n").encode("utf-8")
+
+def load_json(data: bytes | memoryview) -> Any:
+    """Parse JSON from bytes or a buffer (orjson when available)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    import json
+    return json.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+@contextmanager
+def map_file(fd: int, size: int) -> Iterator[memoryview]:
+    """Read-only view of the first ``size`` bytes of ``fd`` via mmap (no read() copy).
+
+    Callers must not keep slices of the view past the ``with`` block.
+    """
+    with mmap.mmap(fd, size, prot=mmap.PROT_READ) as mm, memoryview(mm) as view:
+        yield view